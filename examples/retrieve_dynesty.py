@@ -56,51 +56,52 @@ def hd209458b_spitzer():
 
     return 1e-6*np.array(wave_bins), np.array(depths), np.array(errors)
 
-stis_bins, stis_depths, stis_errors = hd209458b_stis()
-wfc3_bins, wfc3_depths, wfc3_errors = hd209458b_wfc3()
-spitzer_bins, spitzer_depths, spitzer_errors = hd209458b_spitzer()
-
-bins = np.concatenate([stis_bins, wfc3_bins, spitzer_bins])
-depths = np.concatenate([stis_depths, wfc3_depths, spitzer_depths])
-errors = np.concatenate([stis_errors, wfc3_errors, spitzer_errors])
-
-R_guess = 1.4 * R_jup
-T_guess = 1200
-
-#create a Retriever object
-retriever = CombinedRetriever()
-
-#create a FitInfo object and set best guess parameters
-fit_info = retriever.get_default_fit_info(
-    Rs=1.19 * R_sun, Mp=0.73 * M_jup, Rp=R_guess, T=T_guess,
-    logZ=0, CO_ratio=0.53, log_cloudtop_P=4,
-    log_scatt_factor=0, scatt_slope=4, error_multiple=1, T_star=6091)
-
-#Add fitting parameters - this specifies which parameters you want to fit
-#e.g. since we have not included cloudtop_P, it will be fixed at the value specified in the constructor
-
-fit_info.add_gaussian_fit_param('Rs', 0.02*R_sun)
-fit_info.add_gaussian_fit_param('Mp', 0.04*M_jup)
-
-fit_info.add_uniform_fit_param('Rp', 0.9*R_guess, 1.1*R_guess)
-fit_info.add_uniform_fit_param('T', 0.5*T_guess, 1.5*T_guess)
-fit_info.add_uniform_fit_param("log_scatt_factor", 0, 1)
-fit_info.add_uniform_fit_param("logZ", -1, 3)
-fit_info.add_uniform_fit_param("log_cloudtop_P", -0.99, 5)
-fit_info.add_uniform_fit_param("error_multiple", 0.5, 5)
-
-#Use Nested Sampling to do the fitting
-result = retriever.run_dynesty(bins, depths, errors,
-                                 None, None, None,
-                                 fit_info,
-                                 sample="rwalk",
-                                 rad_method="xsec") #"ktables" to use corr-k
-with open("example_retrieval_result.pkl", "wb") as f:
-    pickle.dump(result, f)
-
-#Useful members: result.samples, result.weights, result.logl, result.logp    
-
-#Plot the spectrum and save it to best_fit.png
-plotter = Plotter()
-plotter.plot_retrieval_transit_spectrum(result, prefix="best_fit")
-plotter.plot_retrieval_corner(result, filename="dynesty_corner.png")
+if __name__ == "__main__":
+    stis_bins, stis_depths, stis_errors = hd209458b_stis()
+    wfc3_bins, wfc3_depths, wfc3_errors = hd209458b_wfc3()
+    spitzer_bins, spitzer_depths, spitzer_errors = hd209458b_spitzer()
+
+    bins = np.concatenate([stis_bins, wfc3_bins, spitzer_bins])
+    depths = np.concatenate([stis_depths, wfc3_depths, spitzer_depths])
+    errors = np.concatenate([stis_errors, wfc3_errors, spitzer_errors])
+
+    R_guess = 1.4 * R_jup
+    T_guess = 1200
+
+    #create a Retriever object
+    retriever = CombinedRetriever()
+
+    #create a FitInfo object and set best guess parameters
+    fit_info = retriever.get_default_fit_info(
+        Rs=1.19 * R_sun, Mp=0.73 * M_jup, Rp=R_guess, T=T_guess,
+        logZ=0, CO_ratio=0.53, log_cloudtop_P=4,
+        log_scatt_factor=0, scatt_slope=4, error_multiple=1, T_star=6091)
+
+    #Add fitting parameters - this specifies which parameters you want to fit
+    #e.g. since we have not included cloudtop_P, it will be fixed at the value specified in the constructor
+
+    fit_info.add_gaussian_fit_param('Rs', 0.02*R_sun)
+    fit_info.add_gaussian_fit_param('Mp', 0.04*M_jup)
+
+    fit_info.add_uniform_fit_param('Rp', 0.9*R_guess, 1.1*R_guess)
+    fit_info.add_uniform_fit_param('T', 0.5*T_guess, 1.5*T_guess)
+    fit_info.add_uniform_fit_param("log_scatt_factor", 0, 1)
+    fit_info.add_uniform_fit_param("logZ", -1, 3)
+    fit_info.add_uniform_fit_param("log_cloudtop_P", -0.99, 5)
+    fit_info.add_uniform_fit_param("error_multiple", 0.5, 5)
+
+    #Use Nested Sampling to do the fitting
+    result = retriever.run_dynesty(bins, depths, errors,
+                                     None, None, None,
+                                     fit_info,
+                                     sample="rwalk",
+                                     rad_method="xsec") #"ktables" to use corr-k
+    with open("example_retrieval_result.pkl", "wb") as f:
+        pickle.dump(result, f)
+
+    #Useful members: result.samples, result.weights, result.logl, result.logp    
+
+    #Plot the spectrum and save it to best_fit.png
+    plotter = Plotter()
+    plotter.plot_retrieval_transit_spectrum(result, prefix="best_fit")
+    plotter.plot_retrieval_corner(result, filename="dynesty_corner.png")
@@ -35,67 +35,67 @@ def eclipse_spitzer():
 
     return 1e-6*np.array(wave_bins), depths, errors
 
-wfc3_bins, wfc3_depths, wfc3_errors = eclipse_wfc3()
-spitzer_bins, spitzer_depths, spitzer_errors = eclipse_spitzer()
-
-eclipse_bins = np.concatenate([wfc3_bins, spitzer_bins])
-eclipse_depths = np.concatenate([wfc3_depths, spitzer_depths])
-eclipse_errors = np.concatenate([wfc3_errors, spitzer_errors])
-
-R_guess = 1.113 * R_jup
-T_star = 5052
-
-#create a Retriever object
-retriever = CombinedRetriever()
-
-#create a FitInfo object and set best guess parameters
-fit_info = retriever.get_default_fit_info(
-    Rs=0.75 * R_sun, Mp=1.123 * M_jup, Rp=R_guess,
-    logZ=0, CO_ratio=0.53, log_cloudtop_P=np.inf,
-    log_scatt_factor=0, scatt_slope=4, error_multiple=1, T_star=T_star,
-    a = 0.03142 * AU,
-    log_k_th = -2.52, log_gamma=-0.8, log_gamma2=-0.8, alpha=0.5, beta=1,
-    profile_type="radiative_solution", #"isothermal" for isothermal fitting
-    offset_start=0, offset_end=len(wfc3_bins)
-    )
-
-#Add fitting parameters - this specifies which parameters you want to fit
-#e.g. since we have not included cloudtop_P, it will be fixed at the value specified in the constructor
-
-#Chemistry
-fit_info.add_uniform_fit_param("logZ", -1, 3)
-fit_info.add_uniform_fit_param("CO_ratio", 0.2, 2)
-
-#T/P profile parameters
-fit_info.add_uniform_fit_param("log_k_th", -5, 0)
-fit_info.add_uniform_fit_param("log_gamma", -4, 1)
-fit_info.add_uniform_fit_param("log_gamma2", -4, 1)
-fit_info.add_uniform_fit_param("alpha", 0, 0.5)
-fit_info.add_uniform_fit_param("beta", 0, 2)
-
-#Nuisance parameters
-fit_info.add_gaussian_fit_param("offset_eclipse", 39e-6)
-
-#Use Nested Sampling to do the fitting
-result = retriever.run_dynesty(None, None, None,
-                                 eclipse_bins, eclipse_depths, eclipse_errors,
-                                 fit_info, nlive=200,
-                                 sample="rwalk",
-                                 rad_method="xsec") #"ktables" instead of "xsec" for correlated k
-
-with open("example_retrieval_result.pkl", "wb") as f:
-    pickle.dump(result, f)
-
-plotter = Plotter()
-#Plot the spectrum and save it to best_fit.png
-plotter.plot_retrieval_eclipse_spectrum(result, prefix='best_fit')
-
-#Plot the 2D posteriors with "corner" package and save it to multinest_corner.png
-plotter.plot_retrieval_corner(result, filename="dynesty_corner.png")
-
-#Plot the contribution function
-plotter.plot_eclipse_contrib_func(result.best_fit_eclipse_dict, prefix='best_fit')
-
-#Plot the retrieved TP profiles
-plotter.plot_retrieval_TP_profiles(result, plot_samples=True, plot_1sigma_bounds=False, prefix='dynesty')
-
+if __name__ == "__main__":
+    wfc3_bins, wfc3_depths, wfc3_errors = eclipse_wfc3()
+    spitzer_bins, spitzer_depths, spitzer_errors = eclipse_spitzer()
+
+    eclipse_bins = np.concatenate([wfc3_bins, spitzer_bins])
+    eclipse_depths = np.concatenate([wfc3_depths, spitzer_depths])
+    eclipse_errors = np.concatenate([wfc3_errors, spitzer_errors])
+
+    R_guess = 1.113 * R_jup
+    T_star = 5052
+
+    #create a Retriever object
+    retriever = CombinedRetriever()
+
+    #create a FitInfo object and set best guess parameters
+    fit_info = retriever.get_default_fit_info(
+        Rs=0.75 * R_sun, Mp=1.123 * M_jup, Rp=R_guess,
+        logZ=0, CO_ratio=0.53, log_cloudtop_P=np.inf,
+        log_scatt_factor=0, scatt_slope=4, error_multiple=1, T_star=T_star,
+        a = 0.03142 * AU,
+        log_k_th = -2.52, log_gamma=-0.8, log_gamma2=-0.8, alpha=0.5, beta=1,
+        profile_type="radiative_solution", #"isothermal" for isothermal fitting
+        offset_start=0, offset_end=len(wfc3_bins)
+        )
+
+    #Add fitting parameters - this specifies which parameters you want to fit
+    #e.g. since we have not included cloudtop_P, it will be fixed at the value specified in the constructor
+
+    #Chemistry
+    fit_info.add_uniform_fit_param("logZ", -1, 3)
+    fit_info.add_uniform_fit_param("CO_ratio", 0.2, 2)
+
+    #T/P profile parameters
+    fit_info.add_uniform_fit_param("log_k_th", -5, 0)
+    fit_info.add_uniform_fit_param("log_gamma", -4, 1)
+    fit_info.add_uniform_fit_param("log_gamma2", -4, 1)
+    fit_info.add_uniform_fit_param("alpha", 0, 0.5)
+    fit_info.add_uniform_fit_param("beta", 0, 2)
+
+    #Nuisance parameters
+    fit_info.add_gaussian_fit_param("offset_eclipse", 39e-6)
+
+    #Use Nested Sampling to do the fitting
+    result = retriever.run_dynesty(None, None, None,
+                                     eclipse_bins, eclipse_depths, eclipse_errors,
+                                     fit_info, nlive=200,
+                                     sample="rwalk",
+                                     rad_method="xsec") #"ktables" instead of "xsec" for correlated k
+
+    with open("example_retrieval_result.pkl", "wb") as f:
+        pickle.dump(result, f)
+
+    plotter = Plotter()
+    #Plot the spectrum and save it to best_fit.png
+    plotter.plot_retrieval_eclipse_spectrum(result, prefix='best_fit')
+
+    #Plot the 2D posteriors with "corner" package and save it to multinest_corner.png
+    plotter.plot_retrieval_corner(result, filename="dynesty_corner.png")
+
+    #Plot the contribution function
+    plotter.plot_eclipse_contrib_func(result.best_fit_eclipse_dict, prefix='best_fit')
+
+    #Plot the retrieved TP profiles
+    plotter.plot_retrieval_TP_profiles(result, plot_samples=True, plot_1sigma_bounds=False, prefix='dynesty')
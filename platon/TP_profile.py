@@ -1,4 +1,3 @@
-import matplotlib.pyplot as plt
 from . import _cupy_numpy as xp
 expn=xp.scipy.special.expn
 
@@ -1,6 +1,7 @@
+from collections import OrderedDict
+
 import numpy as np
 import scipy.interpolate
-import matplotlib.pyplot as plt
 
 from pkg_resources import resource_filename
 from ._hist import get_num_bins
@@ -11,6 +12,7 @@ from ._loader import load_dict_from_pickle, load_numpy
 from .abundance_getter import AbundanceGetter
 from ._species_data_reader import read_species_data
 from . import _interpolator_3D
+from . import _numba_kernels
 from ._tau_calculator import get_line_of_sight_tau
 from .constants import k_B, AMU, M_sun, Teff_sun, G, h, c
 from ._get_data import get_data_if_needed
@@ -20,16 +22,20 @@ from ._interpolator_3D import regular_grid_interp, interp1d
 
 class AtmosphereSolver:
     def __init__(self, include_condensation=True, ref_pressure=1e5, method='xsec', include_opacities=[], downsample=1):
-        self.arguments = locals()
-        del self.arguments["self"]
-
         get_data_if_needed()
         
-        self.absorption_data, self.mass_data, self.polarizability_data = read_species_data(
+        absorption_cube, self.absorption_data, self.mass_data, self.polarizability_data = read_species_data(
             resource_filename(__name__, "data/Absorption"),
             resource_filename(__name__, "data/species_info"),
             method, include_opacities, downsample)
 
+        # Per-species constants as arrays, indexed through _species_index
+        self._species_index = {name: i for i, name in enumerate(self.mass_data)}
+        self._mass_vec = xp.array([self.mass_data[name] for name in self.mass_data])
+        self._scatt_species = tuple(self.polarizability_data)
+        self._scatt_pol_sqr = xp.array(
+            [self.polarizability_data[name]**2 for name in self._scatt_species])
+
         self.low_res_lambdas = load_numpy("data/low_res_lambdas.npy")
         self.stellar_spectra_dict = load_dict_from_pickle("data/stellar_spectra.pkl")                    
         
@@ -50,19 +56,41 @@ class AtmosphereSolver:
         self.collisional_absorption_data = load_dict_from_pickle(
             "data/collisional_absorption.pkl")
         
-        for key in self.collisional_absorption_data:
-            val = interp1d(self.lambda_grid, self.low_res_lambdas, self.collisional_absorption_data[key].T).T
-            self.collisional_absorption_data[key] = xp.copy(val, order="C")
+        # Interpolate all collisional pairs onto lambda_grid at once, as a
+        # (N_pairs, N_T, N_lambda) cube
+        self._collisional_pairs = list(self.collisional_absorption_data.keys())
+        low_res_cube = xp.stack([self.collisional_absorption_data[pair]
+                                 for pair in self._collisional_pairs])
+        val = interp1d(self.lambda_grid, self.low_res_lambdas,
+                       low_res_cube.reshape((-1, len(self.low_res_lambdas))).T).T
+        val = val.reshape((len(self._collisional_pairs), -1, len(self.lambda_grid)))
+        self._set_collisional_cube(xp.copy(val, order="C"))
             
         self.P_grid = load_numpy("data/pressures.npy")
         self.T_grid = load_numpy("data/temperatures.npy")
+        self._log10_P_grid = xp.log10(self.P_grid)
+        self._ln_P_grid = xp.log(self.P_grid)
 
         self.N_lambda = len(self.lambda_grid)
         self.N_T = len(self.T_grid)
         self.N_P = len(self.P_grid)
 
+        self._gas_species = list(self.absorption_data.keys())
+        if absorption_cube is None:
+            absorption_cube = xp.zeros((0, self.N_T, self.N_P, self.N_lambda),
+                                       dtype=xp.float32)
+        self._set_gas_cube(absorption_cube)
+
         self.wavelength_rebinned = False
         self.wavelength_bins = None
+        self._clear_wavelength_caches()
+
+        # Keep the full-resolution arrays, so that changing the wavelength
+        # bins again does not require reloading everything from disk
+        self._full_lambda_grid = self.lambda_grid
+        self._full_stellar_spectra = self.stellar_spectra
+        self._full_gas_cube = self._gas_cube
+        self._full_collisional_cube = self._collisional_cube
 
         self.abundance_getter = AbundanceGetter(include_condensation)
         self.min_temperature = max(self.T_grid.min(), self.abundance_getter.min_temperature)
@@ -71,6 +99,7 @@ class AtmosphereSolver:
         self.ref_pressure = ref_pressure
         self.method = method
         self._mie_cache = MieCache()
+        self._cond_cache = OrderedDict()
 
         self.all_cross_secs = load_dict_from_pickle("data/all_cross_secs.pkl")
         self.all_radii = load_numpy("data/mie_radii.npy")
@@ -78,6 +107,91 @@ class AtmosphereSolver:
         self.d_ln_radii = np.median(diffs)
         assert(np.allclose(diffs, self.d_ln_radii))
 
+    def _set_gas_cube(self, gas_cube):
+        '''Stores the (N_species, N_T, N_P, N_lambda) gas absorption cube, with
+        species in the order of self._gas_species, and makes the entries of
+        self.absorption_data views into it.'''
+        self._gas_cube = gas_cube
+        for i, name in enumerate(self._gas_species):
+            self.absorption_data[name] = self._gas_cube[i]
+
+    def _set_collisional_cube(self, collisional_cube):
+        '''Same as _set_gas_cube, but for the (N_pairs, N_T, N_lambda)
+        collisional absorption cube and self.collisional_absorption_data'''
+        self._collisional_cube = collisional_cube
+        for i, pair in enumerate(self._collisional_pairs):
+            self.collisional_absorption_data[pair] = self._collisional_cube[i]
+
+    def _get_condition_arrays(self, T_profile, P_profile, cloudtop_pressure,
+                              max_cache_size=32):
+        '''Returns T_cond and P_cond for the given profile.  These depend
+        only on the extent of the profile, so recent results are cached by
+        (min, max) of T and P.  The returned arrays must not be modified.'''
+        key = (float(xp.amin(T_profile)), float(xp.amax(T_profile)),
+               float(xp.amin(P_profile)), float(xp.amax(P_profile)),
+               float(cloudtop_pressure))
+        if key in self._cond_cache:
+            self._cond_cache.move_to_end(key)
+            return self._cond_cache[key]
+
+        T_cond = _interpolator_3D.get_condition_array(T_profile, self.T_grid)
+        P_cond = _interpolator_3D.get_condition_array(
+            P_profile, self.P_grid, cloudtop_pressure)
+        self._cond_cache[key] = (T_cond, P_cond)
+        if len(self._cond_cache) > max_cache_size:
+            self._cond_cache.popitem(last=False)
+        return T_cond, P_cond
+
+    def _get_composition_absorption(self, abundances, active_abundances,
+                                    P_cond, T_cond, n, add_gas_absorption,
+                                    add_H_minus_absorption,
+                                    add_collisional_absorption,
+                                    zero_opacities, cache_key=None,
+                                    max_cache_size=4):
+        '''Returns the sum of the gas, H- and collisional absorption on the
+        truncated T/P grid.  If cache_key is not None, recent results are
+        cached under it.  The returned array must not be modified.'''
+        if cache_key is not None and cache_key in self._absorption_cache:
+            self._absorption_cache.move_to_end(cache_key)
+            return self._absorption_cache[cache_key]
+
+        absorption_coeff = xp.zeros((int(xp.sum(T_cond)), int(xp.sum(P_cond)), self.N_lambda))
+        if add_gas_absorption:
+            absorption_coeff += self._get_gas_absorption(active_abundances, P_cond, T_cond, zero_opacities=zero_opacities)
+        if add_H_minus_absorption:
+            absorption_coeff += self._get_H_minus_absorption(abundances, P_cond, T_cond)
+        if add_collisional_absorption:
+            absorption_coeff += self._get_collisional_absorption(
+                active_abundances, P_cond, T_cond, n=n)
+
+        if cache_key is not None:
+            self._absorption_cache[cache_key] = absorption_coeff
+            if len(self._absorption_cache) > max_cache_size:
+                self._absorption_cache.popitem(last=False)
+        return absorption_coeff
+
+    def _get_species_indices(self, species_names):
+        return xp.array([self._species_index[name] for name in species_names],
+                        dtype=int)
+
+    def _clear_wavelength_caches(self):
+        # Quantities that depend only on lambda_grid, computed on first use
+        self._ln_lambda_grid = None
+        self._rayleigh_key = None
+        self._rayleigh_prefactor = None
+        self._H_minus_coeffs = None
+        self._absorption_cache = OrderedDict()
+
+    def _restore_full_wavelength_grid(self):
+        self.lambda_grid = self._full_lambda_grid
+        self.N_lambda = len(self.lambda_grid)
+        self.stellar_spectra = self._full_stellar_spectra
+        self._set_gas_cube(self._full_gas_cube)
+        self._set_collisional_cube(self._full_collisional_cube)
+        self._clear_wavelength_caches()
+        self.wavelength_rebinned = False
+        self.wavelength_bins = None
+
     def get_lambda_grid(self):
         return xp.cpu(self.lambda_grid)
         
@@ -96,27 +210,30 @@ class AtmosphereSolver:
 
         Raises
         ------
-        NotImplementedError
-            Raised when `change_wavelength_bins` is called more than once,
-            which is not supported.
+        ValueError
+            Raised when a bin is outside the wavelength grid, or contains no
+            wavelengths.
         """
-        bins = xp.array(bins)
         if self.wavelength_rebinned:
-            self.__init__(**self.arguments)
-            self.wavelength_rebinned = False        
-            
+            self._restore_full_wavelength_grid()
+
         if bins is None:
             return
 
-        for start, end in bins:
-            if start < self.lambda_grid.min() \
-               or start > self.lambda_grid.max() \
-               or end < self.lambda_grid.min() \
-               or end > self.lambda_grid.max():
+        bins = xp.array(bins)
+
+        # lambda_grid is sorted, so the points strictly inside each bin form a
+        # contiguous range [starts[i], ends[i])
+        min_lambda = self.lambda_grid[0]
+        max_lambda = self.lambda_grid[-1]
+        starts = xp.cpu(xp.searchsorted(self.lambda_grid, bins[:, 0], side="right"))
+        ends = xp.cpu(xp.searchsorted(self.lambda_grid, bins[:, 1], side="left"))
+
+        for (start, end), num_points in zip(bins, ends - starts):
+            if start < min_lambda or start > max_lambda \
+               or end < min_lambda or end > max_lambda:
                 raise ValueError("Invalid wavelength bin: {}-{} meters".format(start, end))
-            num_points = xp.sum(xp.logical_and(self.lambda_grid > start,
-                                               self.lambda_grid < end))
-            if num_points == 0:
+            if num_points <= 0:
                 raise ValueError("Wavelength bin too narrow: {}-{} meters".format(start, end))
             if num_points <= 5:
                 print("WARNING: only {} points in {}-{} m bin. Results will be inaccurate".format(num_points, start, end))
@@ -124,36 +241,46 @@ class AtmosphereSolver:
         self.wavelength_rebinned = True
         self.wavelength_bins = bins
 
-        cond = xp.any(xp.array([
-            xp.logical_and(self.lambda_grid > start, self.lambda_grid < end) \
-            for (start, end) in bins]), axis=0)
+        cond = xp.zeros(self.N_lambda, dtype=bool)
+        for start_index, end_index in zip(starts, ends):
+            cond[start_index : end_index] = True
 
-        for key in self.absorption_data:
-            self.absorption_data[key] = self.absorption_data[key][:, :, cond]
+        # compress makes one C-contiguous copy; boolean indexing along the
+        # last axis would return a non-contiguous array
+        self._set_gas_cube(xp.compress(cond, self._gas_cube, axis=-1))
 
         self.lambda_grid = self.lambda_grid[cond]
         self.N_lambda = len(self.lambda_grid)
+        self._clear_wavelength_caches()
 
         self.stellar_spectra = self.stellar_spectra[:,cond]
             
-        for key in self.collisional_absorption_data:
-            self.collisional_absorption_data[key] = self.collisional_absorption_data[key][:, cond]
+        self._set_collisional_cube(
+            xp.compress(cond, self._collisional_cube, axis=-1))
             
-    def _get_k(self, T, wavelengths):
-        wavelengths = 1e6 * xp.copy(wavelengths)
+    def _get_H_minus_coeffs(self):
+        '''Returns the parts of the H- absorption coefficient that depend
+        only on the wavelength grid, so that _get_k only has to do the
+        temperature-dependent work.'''
+        if self._H_minus_coeffs is not None:
+            return self._H_minus_coeffs
+
+        wavelengths = 1e6 * self.lambda_grid
         alpha = 14391
         lambda_0 = 1.6419
 
-        #Calculate bound-free absorption coefficient
-        k_bf = xp.zeros(len(wavelengths))
-        cond = wavelengths < lambda_0
+        #Bound-free absorption
+        bf = wavelengths < lambda_0
         C = [152.519, 49.534, -118.858, 92.536, -34.194, 4.982]
-        f_lambda = xp.sum(xp.array([C[i-1] * (1/wavelengths[cond] - 1/lambda_0)**((i-1)/2) for i in range(1,7)]), axis=0)
-        sigma = 1e-18 * wavelengths[cond]**3 * (1 / wavelengths[cond] - 1 / lambda_0)**1.5 * f_lambda
-        k_bf[cond] = 0.75 * T**-2.5 * xp.exp(alpha/lambda_0 / T) * (1 - xp.exp(-alpha / wavelengths[cond] / T)) * sigma
-
-        #Now calculate free-free absorption coefficient
-        k_ff = xp.zeros(len(wavelengths))
+        x = 1 / wavelengths[bf] - 1 / lambda_0
+        # f_lambda is a polynomial in sqrt(x); evaluate it with Horner's rule
+        sqrt_x = xp.sqrt(x)
+        f_lambda = xp.zeros(len(x))
+        for coeff in C[::-1]:
+            f_lambda = f_lambda * sqrt_x + coeff
+        sigma = 1e-18 * wavelengths[bf]**3 * x**1.5 * f_lambda
+
+        #Free-free absorption
         mid = xp.logical_and(wavelengths > 0.1823, wavelengths < 0.3645)
         red = wavelengths > 0.3645
                     
@@ -172,13 +299,35 @@ class AtmosphereSolver:
             [0, 0, 0, 0, 0, 0],
             [0, 0, 0, 0, 0, 0]])
 
-        for n in range(1, 7):
-            A_mid = xp.array([wavelengths[mid]**i for i in (2, 0, -1, -2, -3, -4)]).T
-            #print(A_mid.shape)
-            A_red = xp.array([wavelengths[red]**i for i in (2, 0, -1, -2, -3, -4)]).T
-            
-            k_ff[mid] += 1e-29 * (5040/T)**((n+1)/2) * A_mid.dot(ff_matrix_mid[n-1])
-            k_ff[red] += 1e-29 * (5040/T)**((n+1)/2) * A_red.dot(ff_matrix_red[n-1])
+        # Row n-1 of each ff_matrix is weighted by (5040/T)**((n+1)/2), so
+        # K.dot(T_powers) gives the free-free coefficient at any T
+        wavelength_powers = xp.array([2, 0, -1, -2, -3, -4])
+        K_mid = (wavelengths[mid][:, xp.newaxis]**wavelength_powers).dot(ff_matrix_mid.T)
+        K_red = (wavelengths[red][:, xp.newaxis]**wavelength_powers).dot(ff_matrix_red.T)
+
+        self._H_minus_coeffs = {
+            "bf": bf, "sigma": sigma,
+            "alpha_over_lambda_0": alpha / lambda_0,
+            "alpha_over_w": alpha / wavelengths[bf],
+            "mid": mid, "K_mid": K_mid,
+            "red": red, "K_red": K_red}
+        return self._H_minus_coeffs
+
+    def _get_k(self, T):
+        '''Returns the H- absorption coefficient for an array of
+        temperatures, with shape (len(T), N_lambda).'''
+        coeffs = self._get_H_minus_coeffs()
+        T = T[:, xp.newaxis]
+
+        #Calculate bound-free absorption coefficient
+        k_bf = xp.zeros((len(T), self.N_lambda))
+        k_bf[:, coeffs["bf"]] = 0.75 * T**-2.5 * xp.exp(coeffs["alpha_over_lambda_0"] / T) * (1 - xp.exp(-coeffs["alpha_over_w"] / T)) * coeffs["sigma"]
+
+        #Now calculate free-free absorption coefficient
+        k_ff = xp.zeros((len(T), self.N_lambda))
+        T_powers = (5040/T)**(xp.arange(2, 8) / 2)
+        k_ff[:, coeffs["mid"]] += 1e-29 * T_powers.dot(coeffs["K_mid"].T)
+        k_ff[:, coeffs["red"]] += 1e-29 * T_powers.dot(coeffs["K_red"].T)
 
         k = k_bf + k_ff
         
@@ -186,57 +335,93 @@ class AtmosphereSolver:
         return k * 1e-3
     
     def _get_H_minus_absorption(self, abundances, P_cond, T_cond):
-        absorption_coeff = xp.zeros(
-            (int(xp.sum(T_cond)), int(xp.sum(P_cond)), self.N_lambda))
-        
         valid_Ts = self.T_grid[T_cond]
         trunc_el_abundances = abundances["el"][T_cond][:, P_cond]
         trunc_H_abundances = abundances["H"][T_cond][:, P_cond]
-        
-        for t in range(len(valid_Ts)):
-            k = self._get_k(valid_Ts[t], self.lambda_grid)          
-            absorption_coeff[t] = k * (trunc_el_abundances[t] * trunc_H_abundances[t] * self.P_grid[P_cond]**2)[:, xp.newaxis] / (k_B * valid_Ts[t])
-                  
-        return absorption_coeff
-
-    def _get_gas_absorption(self, abundances, P_cond, T_cond, zero_opacities=[]):
-        absorption_coeff = xp.zeros(
-            (int(xp.sum(T_cond)), int(xp.sum(P_cond)), self.N_lambda))
 
-        for species_name, species_abundance in abundances.items():
-            assert(species_abundance.shape == (self.N_T, self.N_P))
-            
-            if (species_name in self.absorption_data) and (species_name not in zero_opacities):
-                absorption_coeff += self.absorption_data[species_name][T_cond][:,P_cond] * species_abundance[T_cond][:,P_cond,xp.newaxis]
+        k = self._get_k(valid_Ts)
+        prefactor = trunc_el_abundances * trunc_H_abundances * self.P_grid[P_cond]**2 / (k_B * valid_Ts[:, xp.newaxis])
+        return k[:, xp.newaxis, :] * prefactor[:, :, xp.newaxis]
 
-        return absorption_coeff
-
-    def _get_scattering_absorption(self, abundances, P_cond, T_cond,
-                                   multiple=1, slope=4, ref_wavelength=1e-6):
-        sum_polarizability_sqr = xp.zeros((int(xp.sum(T_cond)), int(xp.sum(P_cond))))
+    def _get_gas_absorption(self, abundances, P_cond, T_cond, zero_opacities=[]):
+        species_indices = [
+            i for i, species_name in enumerate(self._gas_species)
+            if species_name in abundances and species_name not in zero_opacities]
+        N_T_cond = int(xp.sum(T_cond))
+        N_P_cond = int(xp.sum(P_cond))
+        if len(species_indices) == 0:
+            return xp.zeros((N_T_cond, N_P_cond, self.N_lambda))
+
+        abund_stack = xp.zeros((len(species_indices), N_T_cond, N_P_cond))
+        for i, s in enumerate(species_indices):
+            species_abund = abundances[self._gas_species[s]]
+            assert(species_abund.shape == (self.N_T, self.N_P))
+            abund_stack[i] = species_abund[T_cond][:, P_cond]
+
+        if _numba_kernels.enabled:
+            return _numba_kernels.gas_absorption(
+                self._gas_cube, abund_stack, xp.array(species_indices),
+                xp.nonzero(T_cond)[0], xp.nonzero(P_cond)[0])
+
+        # Contract over species for all wavelengths at once.  This is a
+        # batched (1 x N_species) @ (N_species x N_lambda) product in the
+        # opacities' own float32, so it maps onto BLAS/cuBLAS GEMM instead of
+        # upcasting a copy of the truncated cube to float64.
+        cube = self._gas_cube[species_indices][:, T_cond][:, :, P_cond]
+        cube = cube.reshape(len(species_indices), -1, self.N_lambda).transpose(1, 0, 2)
+        weights = abund_stack.reshape(len(species_indices), -1).T.astype(cube.dtype)
+        result = xp.matmul(weights[:, None, :], cube)
+        return result.reshape(N_T_cond, N_P_cond, self.N_lambda)
+
+    def _get_rayleigh_prefactor(self, slope, ref_wavelength):
+        '''Returns 128/3 pi^5 ref_wavelength^(slope-4) / lambda^slope, the
+        wavelength-dependent part of the scattering cross section.  The
+        result for the most recent slope is kept, and ln(lambda) is kept for
+        the grid, so a new slope costs only one exp.'''
+        key = (slope, ref_wavelength)
+        if key != self._rayleigh_key:
+            if self._ln_lambda_grid is None:
+                self._ln_lambda_grid = xp.log(self.lambda_grid)
+            self._rayleigh_prefactor = 128.0 / 3 * xp.pi**5 * ref_wavelength**(slope - 4) * \
+                xp.exp(-slope * self._ln_lambda_grid)
+            self._rayleigh_key = key
+        return self._rayleigh_prefactor
+
+    def _get_scattering_cross_section(self, abundances, P_cond, T_cond,
+                                      multiple=1, slope=4, ref_wavelength=1e-6):
+        '''Rayleigh scattering cross section per molecule, with shape
+        (N_T_cond, N_P_cond, N_lambda)'''
+        # Only the species with a polarizability scatter
+        present = [name in abundances for name in self._scatt_species]
+        if all(present):
+            species_names = self._scatt_species
+            pol_sqr = self._scatt_pol_sqr
+        else:
+            species_names = [name for name, p in zip(self._scatt_species, present) if p]
+            pol_sqr = self._scatt_pol_sqr[xp.array(present, dtype=bool)]
 
-        for species_name in abundances:
-            if species_name in self.polarizability_data:
-                sum_polarizability_sqr += abundances[species_name][T_cond,:][:,P_cond] * self.polarizability_data[species_name]**2
+        if len(species_names) == 0:
+            sum_polarizability_sqr = xp.zeros((int(xp.sum(T_cond)), int(xp.sum(P_cond))))
+        else:
+            abund_stack = xp.stack(
+                [abundances[name][T_cond][:, P_cond] for name in species_names])
+            sum_polarizability_sqr = xp.tensordot(pol_sqr, abund_stack, 1)
 
-        n = self.P_grid[P_cond] / (k_B * self.T_grid[T_cond][:, xp.newaxis])
-        result = (multiple * (128.0 / 3 * xp.pi**5) * ref_wavelength**(slope - 4) * n * sum_polarizability_sqr)[:, :, xp.newaxis] / self.lambda_grid**slope
-        return result
+        return (multiple * sum_polarizability_sqr)[:, :, xp.newaxis] * \
+            self._get_rayleigh_prefactor(slope, ref_wavelength)
 
-    def _get_collisional_absorption(self, abundances, P_cond, T_cond):
-        absorption_coeff = xp.zeros(
-            (int(xp.sum(T_cond)), int(xp.sum(P_cond)), self.N_lambda))
-        
-        n = self.P_grid[xp.newaxis, P_cond] / (k_B * self.T_grid[T_cond, xp.newaxis])        
-        for s1, s2 in self.collisional_absorption_data:
+    def _get_collisional_absorption(self, abundances, P_cond, T_cond, n):
+        pair_densities = xp.zeros(
+            (len(self._collisional_pairs), int(xp.sum(T_cond)), int(xp.sum(P_cond))))
+        for i, (s1, s2) in enumerate(self._collisional_pairs):
             if s1 in abundances and s2 in abundances:
                 n1 = (abundances[s1][T_cond, :][:, P_cond] * n)
                 n2 = (abundances[s2][T_cond, :][:, P_cond] * n)
-                abs_data = self.collisional_absorption_data[(s1, s2)].reshape(
-                    (self.N_T, 1, -1))[T_cond]
-                absorption_coeff += abs_data * (n1 * n2)[:, :, xp.newaxis]
+                pair_densities[i] = n1 * n2
 
-        return absorption_coeff
+        # All pairs share the same T grid, so contract over pairs in one go
+        return xp.einsum("qtp,qtl->tpl", pair_densities,
+                         self._collisional_cube[:, T_cond])
 
     def _get_mie_scattering_absorption(self, P_cond, T_cond, ri, part_size,
                                        frac_scale_height, max_number_density,
@@ -280,14 +465,20 @@ class AtmosphereSolver:
                                   planet_mass, planet_radius, star_radius,
                                   above_cloud_cond, T_star=None):        
         assert(len(P_profile) == len(T_profile))
-        # First, get atmospheric weight profile
-        mu_profile = xp.zeros(len(P_profile))
+        # First, get atmospheric weight profile.  All species share the same
+        # T/P grid, so stack them and interpolate them together
+        species_names = list(abundances.keys())
+        ln_abund_stack = xp.log(xp.stack(
+            [abundances[name] for name in species_names], axis=-1))
+        interp_abunds = xp.exp(regular_grid_interp(
+            self.T_grid, self._log10_P_grid, ln_abund_stack,
+            T_profile, xp.log10(P_profile)))
+        mass_vec = self._mass_vec[self._get_species_indices(species_names)]
+        mu_profile = interp_abunds.dot(mass_vec)
+
         atm_abundances = {}
-        
-        for species_name in abundances:
-            abund = 10.**regular_grid_interp(self.T_grid, xp.log10(self.P_grid), xp.log10(abundances[species_name]), T_profile, xp.log10(P_profile))
-            atm_abundances[species_name] = abund
-            mu_profile += abund * self.mass_data[species_name]
+        for i, species_name in enumerate(species_names):
+            atm_abundances[species_name] = interp_abunds[:, i]
 
         radii, dr = _hydrostatic_solver._solve(
             P_profile, T_profile, self.ref_pressure, mu_profile, planet_mass,
@@ -300,7 +491,12 @@ class AtmosphereSolver:
 
     def _get_abundances_array(self, logZ, CO_ratio, CH4_mult, custom_abundances, gases, vmrs):
         if custom_abundances is None and logZ is not None and CO_ratio is not None:
-            abunds = self.abundance_getter.get(logZ, CO_ratio)
+            # The abundance getter caches recent grids.  compute_params
+            # modifies the abundances in place, so make one copy of the
+            # (N_species, N_T, N_P) stack; the dict entries are views into it
+            abunds = dict(zip(
+                self.abundance_getter.included_species,
+                xp.copy(self.abundance_getter.get_stack(logZ, CO_ratio))))
             abunds["CH4"] *= CH4_mult
             return abunds
 
@@ -409,12 +605,28 @@ class AtmosphereSolver:
         abundances = self._get_abundances_array(
             logZ, CO_ratio, CH4_mult, custom_abundances, gases, vmrs)
 
-        T_quench = xp.interp(xp.log(P_quench), xp.log(P_profile), T_profile)
         for name in abundances:
-            abundances[name][xp.isnan(abundances[name])] = min_abundance
-            abundances[name][abundances[name] < min_abundance] = min_abundance
-            quench_abund = 10.**regular_grid_interp(self.T_grid, xp.log10(self.P_grid), xp.log10(abundances[name]), T_quench, xp.log10(P_quench))
-            abundances[name][:, self.P_grid <= P_quench] = quench_abund
+            # fmax replaces NaNs with min_abundance as well
+            xp.fmax(abundances[name], min_abundance, out=abundances[name])
+
+        quenched = self.P_grid <= P_quench
+        if xp.any(quenched):
+            # Interpolate all species at the quench point in one call
+            T_quench = xp.interp(xp.log(P_quench), xp.log(P_profile), T_profile)
+            species_names = list(abundances.keys())
+            log_abund_stack = xp.log10(xp.stack(
+                [abundances[name] for name in species_names], axis=-1))
+            quench_abunds = 10.**regular_grid_interp(
+                self.T_grid, self._log10_P_grid, log_abund_stack,
+                T_quench, xp.log10(P_quench))
+            for i, name in enumerate(species_names):
+                abundances[name][:, quenched] = quench_abunds[i]
+
+        # Species that never rise meaningfully above min_abundance contribute
+        # nothing to the gas or collisional opacity, so leave them out there
+        active_abundances = {
+            name: abund for name, abund in abundances.items()
+            if xp.amax(abund) > 10 * min_abundance}
 
         above_clouds = P_profile < cloudtop_pressure
 
@@ -425,46 +637,56 @@ class AtmosphereSolver:
         P_profile = P_profile[above_clouds]
         T_profile = T_profile[above_clouds]
 
-        T_cond = _interpolator_3D.get_condition_array(T_profile, self.T_grid)
-        P_cond = _interpolator_3D.get_condition_array(
-            P_profile, self.P_grid, cloudtop_pressure)
+        T_cond, P_cond = self._get_condition_arrays(
+            T_profile, P_profile, cloudtop_pressure)
 
-        absorption_coeff = xp.zeros((int(xp.sum(T_cond)), int(xp.sum(P_cond)), len(self.lambda_grid)))
-        if add_gas_absorption:
-            absorption_coeff += self._get_gas_absorption(abundances, P_cond, T_cond, zero_opacities=zero_opacities)
-        if add_H_minus_absorption:
-            absorption_coeff += self._get_H_minus_absorption(abundances, P_cond, T_cond)
+        # Number density on the truncated T/P grid, shared by everything below
+        n = self.P_grid[P_cond] / (k_B * self.T_grid[T_cond][:, xp.newaxis])
+
+        # With logZ and C/O (and no quenching), the abundance grids are fully
+        # determined by the arguments, so the absorption computed from them
+        # can be reused by later calls with the same T/P sub-grid
+        cache_key = None
+        if custom_abundances is None and logZ is not None and \
+           not xp.any(self.P_grid <= P_quench):
+            cache_key = (logZ, CO_ratio, CH4_mult, min_abundance,
+                         tuple(zero_opacities), add_gas_absorption,
+                         add_H_minus_absorption, add_collisional_absorption,
+                         xp.cpu(T_cond).tobytes(), xp.cpu(P_cond).tobytes())
+
+        # Cross sections vary less than absorption coefficients by pressure
+        # and temperature, so interpolation should be done with cross sections.
+        # Accumulate everything directly as cross sections: Rayleigh scattering
+        # is naturally per molecule, and dividing the (possibly cached)
+        # composition absorption by n also gives a fresh array to add into.
+        cross_secs = self._get_composition_absorption(
+            abundances, active_abundances, P_cond, T_cond, n,
+            add_gas_absorption, add_H_minus_absorption,
+            add_collisional_absorption, zero_opacities, cache_key) / n[:, :, xp.newaxis]
         if add_scattering:
             if ri is not None:
                 if scattering_factor != 1 or scattering_slope != 4:
                     raise ValueError("Cannot use both parametric and Mie scattering at the same time")
                 
-                absorption_coeff += self._get_mie_scattering_absorption(
+                cross_secs += self._get_mie_scattering_absorption(
                     P_cond, T_cond, ri, part_size,
-                    frac_scale_height, number_density, sigma=part_size_std)
-                absorption_coeff += self._get_scattering_absorption(
+                    frac_scale_height, number_density, sigma=part_size_std) / n[:, :, xp.newaxis]
+                cross_secs += self._get_scattering_cross_section(
                     abundances, P_cond, T_cond)
                 
             else:
-                absorption_coeff += self._get_scattering_absorption(abundances,
+                cross_secs += self._get_scattering_cross_section(abundances,
                 P_cond, T_cond, scattering_factor, scattering_slope,
                 scattering_ref_wavelength)
 
-        if add_collisional_absorption:
-            absorption_coeff += self._get_collisional_absorption(
-                abundances, P_cond, T_cond)
-
-        # Cross sections vary less than absorption coefficients by pressure
-        # and temperature, so interpolation should be done with cross sections
-        cross_secs = absorption_coeff / (self.P_grid[P_cond][xp.newaxis, :, xp.newaxis] / k_B / self.T_grid[T_cond][:, xp.newaxis, xp.newaxis])
-        cross_secs[cross_secs < min_cross_sec] = min_cross_sec
+        xp.maximum(cross_secs, min_cross_sec, out=cross_secs)
         
         if len(self.T_grid[T_cond]) == 1:
-            cross_secs_atm = xp.exp(interp1d(xp.log(P_profile), xp.log(self.P_grid[P_cond]), xp.log(cross_secs[0])))
+            cross_secs_atm = xp.exp(interp1d(xp.log(P_profile), self._ln_P_grid[P_cond], xp.log(cross_secs[0])))
         else:            
             ln_cross = regular_grid_interp(
                 1.0/self.T_grid[T_cond][::-1],
-                xp.log(self.P_grid[P_cond]),
+                self._ln_P_grid[P_cond],
                 xp.log(cross_secs[::-1]),
                 1.0 / T_profile,
                 xp.log(P_profile))
@@ -1,22 +1,27 @@
 from . import _cupy_numpy as xp
+from . import _numba_kernels
 
 def get_condition_array(target_data, interp_data, max_cutoff=xp.inf):
+    '''Returns a boolean mask selecting the contiguous range of the sorted
+    interp_data needed to interpolate onto every point of target_data: from
+    the last grid point at or below min(target_data) to the first grid point
+    at or above min(max(target_data), max_cutoff).'''
     cond = xp.zeros(len(interp_data), dtype=bool)
 
-    start_index = None
-    end_index = None
+    target_min = float(xp.amin(target_data))
+    start_index = int(xp.searchsorted(interp_data, target_min))
+    if start_index == len(interp_data):
+        start_index = None
+    elif interp_data[start_index] != target_min:
+        start_index = max(0, start_index - 1)
+
+    target_max = min(float(xp.amax(target_data)), max_cutoff)
+    end_index = int(xp.searchsorted(interp_data, target_max))
+    if end_index == len(interp_data):
+        end_index = None
+    else:
+        end_index += 1
 
-    for i in range(len(cond)):
-        if start_index is None:
-            if interp_data[i] > target_data.min():
-                start_index = max(0, i-1)
-            if interp_data[i] == target_data.min():
-                start_index = i
-        if end_index is None:
-            if interp_data[i] >= target_data.max() or \
-               interp_data[i] >= max_cutoff:
-                end_index = i + 1
-                
     cond[start_index : end_index] = True
     return cond
 
@@ -63,6 +68,16 @@ def regular_grid_interp(ys, xs, data, target_ys, target_xs):
     y_indices_upper = xp.ceil(y_indices).astype(int)
     y_indices_frac = y_indices - y_indices_lower
 
+    if _numba_kernels.enabled and data.ndim == 3:
+        # Gathers and weights all four corners in one pass, instead of
+        # materialising each corner's (N_targets, N) slice
+        result = _numba_kernels.bilinear_interp(
+            xp.ascontiguousarray(data), y_indices_lower, y_indices_upper,
+            y_indices_frac, x_indices_lower, x_indices_upper, x_indices_frac)
+        if isscalar:
+            return result[0]
+        return result
+
     if data.ndim > 2 and not xp.isscalar(target_ys):
         x_indices_frac = x_indices_frac[:, xp.newaxis]
         y_indices_frac = y_indices_frac[:, xp.newaxis]
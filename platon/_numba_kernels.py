@@ -0,0 +1,61 @@
+import numpy as np
+from . import _cupy_numpy as xp
+
+# numba is optional, and only helps when running on the CPU.  With cupy, the
+# array operations already run on the GPU and these kernels are not used.
+try:
+    import numba
+    enabled = xp.ndarray is np.ndarray
+except ImportError:
+    numba = None
+    enabled = False
+
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def gas_absorption(cube, abundances, species_indices, T_indices, P_indices):
+        '''cube has shape (N_species, N_T, N_P, N_lambda) and abundances has
+        shape (len(species_indices), len(T_indices), len(P_indices)).  Returns
+        the abundance-weighted sum of
+        cube[species_indices][:, T_indices][:, :, P_indices] over species,
+        without making a copy of the truncated cube.'''
+        num_species = len(species_indices)
+        num_T = len(T_indices)
+        num_P = len(P_indices)
+        num_lambda = cube.shape[3]
+        result = np.zeros((num_T, num_P, num_lambda))
+
+        for i in numba.prange(num_T * num_P):
+            t = i // num_P
+            p = i % num_P
+            for s in range(num_species):
+                abundance = abundances[s, t, p]
+                if abundance == 0:
+                    continue
+                for l in range(num_lambda):
+                    result[t, p, l] += abundance * cube[species_indices[s], T_indices[t], P_indices[p], l]
+
+        return result
+
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def bilinear_interp(data, y_lower, y_upper, y_frac, x_lower, x_upper, x_frac):
+        '''Bilinear interpolation of data, with shape (N_y, N_x, N), at the
+        points given by the (lower index, upper index, fraction) arrays.
+        Returns an array of shape (len(y_frac), N).'''
+        num_points = len(y_frac)
+        num_values = data.shape[2]
+        result = np.empty((num_points, num_values))
+
+        for k in numba.prange(num_points):
+            w_ll = (1 - y_frac[k]) * (1 - x_frac[k])
+            w_ul = y_frac[k] * (1 - x_frac[k])
+            w_lu = (1 - y_frac[k]) * x_frac[k]
+            w_uu = y_frac[k] * x_frac[k]
+            for l in range(num_values):
+                result[k, l] = w_ll * data[y_lower[k], x_lower[k], l] + \
+                    w_ul * data[y_upper[k], x_lower[k], l] + \
+                    w_lu * data[y_lower[k], x_upper[k], l] + \
+                    w_uu * data[y_upper[k], x_upper[k], l]
+
+        return result
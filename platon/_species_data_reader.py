@@ -2,6 +2,10 @@ from . import _cupy_numpy as xp
 import os
 
 def read_species_data(absorption_dir, species_info_file, method, include_opacities, downsample=1):
+    '''Returns (absorption_cube, absorption_data, mass_data,
+    polarizability_data).  absorption_cube has shape (N_species, N_T, N_P,
+    N_lambda), with species in the order of absorption_data, whose values are
+    views into it.  absorption_cube is None if no opacities are included.'''
     if method == "xsec":
         absorption_file_prefix = "absorb_coeffs_"
     elif method == "ktables":
@@ -9,7 +13,7 @@ def read_species_data(absorption_dir, species_info_file, method, include_opaciti
     else:
         assert(False)
         
-    absorption_data = dict()
+    absorption_filenames = dict()
     mass_data = dict()
     polarizability_data = dict()
 
@@ -24,11 +28,25 @@ def read_species_data(absorption_dir, species_info_file, method, include_opaciti
             absorption_filename = os.path.join(
                 absorption_dir, absorption_file_prefix + name + ".npy")
             if os.path.isfile(absorption_filename) and name in include_opacities:
-                absorption_data[name] = xp.load(absorption_filename)
-                absorption_data[name] = xp.copy(absorption_data[name][:,:,::downsample], order='C')
+                absorption_filenames[name] = absorption_filename
             mass_data[name] = mass
 
             if polarizability != 0:
                 polarizability_data[name] = polarizability
 
-    return absorption_data, mass_data, polarizability_data
+    # Read each file straight into its slot of one preallocated cube, so that
+    # neither a full double-precision copy of a file nor a second copy of all
+    # the opacities is ever held in memory.  Single precision halves the
+    # memory and bandwidth of the largest arrays in PLATON, at negligible
+    # cost in accuracy.
+    absorption_cube = None
+    absorption_data = dict()
+    for i, name in enumerate(absorption_filenames):
+        data = xp.load(absorption_filenames[name], mmap_mode="r")[:,:,::downsample]
+        if absorption_cube is None:
+            absorption_cube = xp.empty((len(absorption_filenames),) + data.shape,
+                                       dtype=xp.float32)
+        absorption_cube[i] = data
+        absorption_data[name] = absorption_cube[i]
+
+    return absorption_cube, absorption_data, mass_data, polarizability_data
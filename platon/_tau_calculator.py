@@ -1,15 +1,20 @@
 import sys
+import numpy as np
 from . import _cupy_numpy as xp
 import time
-import matplotlib.pyplot as plt
+
+if xp.ndarray is np.ndarray:
+    from scipy.linalg import blas
+else:
+    blas = None
 
 
 def get_dl(radii):
     '''Radii must be in descending order.  Returns dl[i,j], the distance travelled by a ray with impact parameter radii[j+1] from the shell at radii[i+1] to radii[i].'''
 
-    r_mesh, r_prime_mesh = xp.meshgrid(radii, radii)
-    sqr_length = r_prime_mesh[:, 0:-1]**2 - r_mesh[:, 1:]**2
-    sqr_length[sqr_length < 0] = 0
+    radii_sqr = radii**2
+    sqr_length = radii_sqr[:, xp.newaxis] - radii_sqr[xp.newaxis, 1:]
+    xp.maximum(sqr_length, 0, out=sqr_length)
     lengths = 2 * xp.sqrt(sqr_length)
 
     dl = lengths[0:-1] - lengths[1:]
@@ -23,4 +28,9 @@ def get_line_of_sight_tau(absorption_coeff, radii):
     intermediate_coeff = 0.5 * \
         (absorption_coeff[0:-1] + absorption_coeff[1:])
     dl = get_dl(radii)
+    if blas is not None:
+        # dl[i,j] is 0 for i > j (the ray never reaches those shells), so
+        # use a triangular multiply, which does half the work of xp.dot
+        return blas.dtrmm(1.0, dl, intermediate_coeff, trans_a=1,
+                          overwrite_b=True).T
     return xp.dot(intermediate_coeff.T, dl)
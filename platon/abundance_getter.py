@@ -1,11 +1,14 @@
 from . import _cupy_numpy as xp
+from collections import OrderedDict
 from io import open
 import configparser
 from pkg_resources import resource_filename
 
-from ._interpolator_3D import regular_grid_interp
 
 class AbundanceGetter:
+    # Number of (logZ, CO_ratio) results kept by get_stack
+    _max_cache_size = 8
+
     def __init__(self, include_condensation=True):
         config = configparser.ConfigParser()
         config.read(resource_filename(__name__, "data/abundances/properties.cfg"))
@@ -22,12 +25,77 @@ class AbundanceGetter:
         else:
             filename = "gas_only.npy"
 
-        abundances_path = "data/abundances/{}".format(filename)
+        self._abundances_path = resource_filename(
+            __name__, "data/abundances/{}".format(filename))
+        self._log_abundances = None
+        self._abundance_cache = OrderedDict()
+
+    @property
+    def log_abundances(self):
+        '''The log10 abundance grid, loaded on first use.  Constructing an
+        AbundanceGetter therefore only reads the small properties file.'''
+        if self._log_abundances is None:
+            # Memory-map the grid so that log10 reads straight from the file,
+            # instead of first loading a full-size copy into memory.  The log
+            # abundances are stored in single precision to halve the memory
+            # of the grid; get() interpolates them in double precision.
+            self._log_abundances = xp.log10(
+                xp.load(self._abundances_path, mmap_mode="r"),
+                dtype=xp.float32)
+        return self._log_abundances
+
+    def __getstate__(self):
+        # Don't pickle the grid or the caches derived from it (e.g. when a
+        # spawned worker receives the retriever); the copy reloads the grid
+        # from the memory-mapped file when it is first needed.
+        state = self.__dict__.copy()
+        state["_log_abundances"] = None
+        state["_abundance_cache"] = OrderedDict()
+        return state
+
+    def _get_corner_weights(self, logZ, CO_ratio):
+        '''Returns a list of (logZ index, C/O index, weight) for the four grid
+        points surrounding (logZ, CO_ratio).'''
+        y_index = float(xp.interp(xp.atleast_1d(xp.float32(logZ)), self.logZs,
+                                  xp.arange(len(self.logZs)))[0])
+        x_index = float(xp.interp(xp.atleast_1d(xp.float32(CO_ratio)),
+                                  self.CO_ratios,
+                                  xp.arange(len(self.CO_ratios)))[0])
+        y_lower = int(xp.floor(y_index))
+        y_upper = int(xp.ceil(y_index))
+        y_frac = y_index - y_lower
+        x_lower = int(xp.floor(x_index))
+        x_upper = int(xp.ceil(x_index))
+        x_frac = x_index - x_lower
+
+        return [
+            (y_lower, x_lower, (1 - y_frac) * (1 - x_frac)),
+            (y_upper, x_lower, y_frac * (1 - x_frac)),
+            (y_lower, x_upper, (1 - y_frac) * x_frac),
+            (y_upper, x_upper, y_frac * x_frac)]
+
+    def get_stack(self, logZ, CO_ratio=0.53):
+        '''Like get(), but returns one cached (N_species, N_T, N_P) array in
+        the order of included_species.  It must not be modified.'''
+        key = (logZ, CO_ratio)
+        if key in self._abundance_cache:
+            self._abundance_cache.move_to_end(key)
+            return self._abundance_cache[key]
+
+        # All species share the same logZ/CO grid, so find the bracketing
+        # grid points once and interpolate every species in one pass
+        interp_log_abund = 0
+        for y_index, x_index, weight in self._get_corner_weights(logZ, CO_ratio):
+            # Double precision, so that tiny abundances do not underflow
+            interp_log_abund = interp_log_abund + xp.multiply(
+                weight, self.log_abundances[y_index, x_index], dtype=xp.float64)
+        abundances = 10**interp_log_abund
+
+        self._abundance_cache[key] = abundances
+        if len(self._abundance_cache) > self._max_cache_size:
+            self._abundance_cache.popitem(last=False)
+        return abundances
 
-        self.log_abundances = xp.log10(xp.load(
-            resource_filename(__name__, abundances_path)))
-                 
-        
     def get(self, logZ, CO_ratio=0.53):
         '''Get an abundance grid at the specified logZ and C/O ratio.  This
         abundance grid can be passed to TransitDepthCalculator, with or without
@@ -40,13 +108,8 @@ class AbundanceGetter:
             A dictionary mapping species name to a 2D abundance array, specifying
             the number fraction of the species at a certain temperature and
             pressure.'''
-        interp_log_abund = 10**regular_grid_interp(self.logZs, self.CO_ratios, self.log_abundances, xp.float32(logZ), xp.float32(CO_ratio))
-
-        abund_dict = {}
-        for i, s in enumerate(self.included_species):
-            abund_dict[s] = interp_log_abund[i]
-
-        return abund_dict
+        abundances = xp.copy(self.get_stack(logZ, CO_ratio))
+        return dict(zip(self.included_species, abundances))
 
     def is_in_bounds(self, logZ, CO_ratio, T):
         '''Check to see if a certain metallicity, C/O ratio, and temperature
@@ -1,7 +1,7 @@
 import os
+import multiprocessing
 
 import numpy as np
-import matplotlib.pyplot as plt
 import scipy.interpolate
 import emcee
 from dynesty import NestedSampler
@@ -22,6 +22,37 @@ from ._output_writer import write_param_estimates_file
 from .TP_profile import Profile
 from .retrieval_result import RetrievalResult
 from .custom_dynesty_result import CustomDynestyResult
+from . import _numba_kernels
+
+# Set in each worker process by _init_worker, so that the calculators are
+# sent to every worker once instead of with every batch of evaluations
+_worker_state = None
+
+def _init_worker(retriever, ln_prob_args):
+    global _worker_state
+    _worker_state = (retriever, ln_prob_args)
+    if _numba_kernels.numba is not None:
+        # The workers already share the cores; one numba thread each
+        _numba_kernels.numba.set_num_threads(1)
+
+def _make_pool(num_processes, retriever, ln_prob_args):
+    # Spawn rather than fork: forking a process whose numba thread pool is
+    # already running (after any compute_depths call) can hang or abort
+    context = multiprocessing.get_context("spawn")
+    return context.Pool(num_processes, initializer=_init_worker,
+                        initargs=(retriever, ln_prob_args))
+
+def _emcee_worker_ln_prob(params):
+    retriever, ln_prob_args = _worker_state
+    return retriever._ln_prob(params, *ln_prob_args)
+
+def _dynesty_worker_ln_like(cube):
+    retriever, ln_prob_args = _worker_state
+    return retriever._dynesty_ln_like(cube, *ln_prob_args)
+
+def _dynesty_worker_transform_prior(cube):
+    retriever, ln_prob_args = _worker_state
+    return retriever._transform_prior(cube, ln_prob_args[2])
 
 class CombinedRetriever:
     def pretty_print(self, fit_info):
@@ -209,11 +240,15 @@ class CombinedRetriever:
         self.last_params = params
         self.last_lnprob = fit_info._ln_prior(params) + ln_likelihood.sum()
         
+        if lnlike_per_point or ret_best_fit:
+            # Also recorded for ret_best_fit, so that the final samples have
+            # pointwise likelihoods even if they were sampled in a worker
+            self.params_to_lnlike[tuple(params)] = ln_likelihood
+
         if ret_best_fit:
             return calculated_transit_depths, transit_info_dict, calculated_eclipse_depths, eclipse_info_dict
 
         if lnlike_per_point:
-            self.params_to_lnlike[tuple(params)] = ln_likelihood
             return ln_likelihood
 
         return ln_likelihood.sum()
@@ -235,13 +270,36 @@ class CombinedRetriever:
 
         return fit_info._ln_prior(params) + ln_like
 
+    def _transform_prior(self, cube, fit_info):
+        new_cube = np.zeros(len(cube))
+        for i in range(len(cube)):
+            new_cube[i] = fit_info._from_unit_interval(i, cube[i])
+        return new_cube
+
+    def _dynesty_ln_like(self, cube, transit_calc, eclipse_calc, fit_info,
+                         measured_transit_depths, measured_transit_errors,
+                         measured_eclipse_depths, measured_eclipse_errors,
+                         zero_opacities=[]):
+        lnlike_per_point = self._ln_like(cube, transit_calc, eclipse_calc, fit_info, measured_transit_depths, measured_transit_errors,
+                                measured_eclipse_depths, measured_eclipse_errors, zero_opacities=zero_opacities, lnlike_per_point=True)
+        if not np.isscalar(lnlike_per_point):
+            ln_like = lnlike_per_point.sum()
+        else:
+            assert(lnlike_per_point == -np.inf)
+            ln_like = -np.inf
+        
+        if np.random.randint(100) == 0:
+            print("\nEvaluated params: {}".format(self.pretty_print(fit_info)))
+        return ln_like
+
 
     def run_emcee(self, transit_bins, transit_depths, transit_errors,
                   eclipse_bins, eclipse_depths, eclipse_errors,
                   fit_info, nwalkers=50,
                   nsteps=1000, include_condensation=True,
                   rad_method="xsec",
-                  num_final_samples=100, zero_opacities=[]):
+                  num_final_samples=100, zero_opacities=[],
+                  num_processes=None, backend_filename=None):
         '''Runs affine-invariant MCMC to retrieve atmospheric parameters.
 
         Parameters
@@ -277,12 +335,26 @@ class CombinedRetriever:
             "xsec" for opacity sampling, "ktables" for correlated k
         zero_opacities : list of strings
             List of molecules to zero opacities for
+        num_processes : int, optional
+            If greater than 1, evaluate the walkers in parallel with a
+            multiprocessing pool of this many processes.  Each worker runs
+            the numba kernels on a single thread; setting OMP_NUM_THREADS=1
+            before starting Python also keeps numpy/scipy's BLAS from
+            starting threads in every worker.  The workers are spawned, so
+            the calling script must be guarded with
+            ``if __name__ == "__main__":``.
+        backend_filename : string, optional
+            If given, stream the chain to this HDF5 file (requires h5py) as
+            the sampler runs, instead of keeping it only in memory.  Any
+            existing chain in the file is overwritten.
 
         Returns
         -------
         result : RetrievalResult object
         '''
         self.params_to_lnlike = {}
+        # all_params may have been edited in place since the last run
+        fit_info._clear_cache()
         initial_positions = fit_info._generate_rand_param_arrays(nwalkers)
         transit_calc = None
         eclipse_calc = None
@@ -297,15 +369,40 @@ class CombinedRetriever:
                 include_condensation=include_condensation, method=rad_method)
             eclipse_calc.change_wavelength_bins(eclipse_bins)       
 
-        sampler = emcee.EnsembleSampler(
-            nwalkers, fit_info._get_num_fit_params(), self._ln_prob,
-            args=(transit_calc, eclipse_calc, fit_info, transit_depths, transit_errors,
-                                 eclipse_depths, eclipse_errors, zero_opacities))
+        ln_prob_args = (transit_calc, eclipse_calc, fit_info, transit_depths, transit_errors,
+                        eclipse_depths, eclipse_errors, zero_opacities)
+        num_dim = fit_info._get_num_fit_params()
+        backend = None
+        if backend_filename is not None:
+            backend = emcee.backends.HDFBackend(backend_filename)
+            backend.reset(nwalkers, num_dim)
+
+        pool = None
+        if num_processes is not None and num_processes > 1:
+            pool = _make_pool(num_processes, self, ln_prob_args)
+            sampler = emcee.EnsembleSampler(
+                nwalkers, num_dim, _emcee_worker_ln_prob, pool=pool,
+                backend=backend)
+        else:
+            sampler = emcee.EnsembleSampler(
+                nwalkers, num_dim, self._ln_prob, args=ln_prob_args,
+                backend=backend)
 
-        for i, result in enumerate(sampler.sample(
-                initial_positions, iterations=nsteps)):
-            if (i + 1) % 10 == 0:
-                print("Step {}: {}".format(i + 1, self.pretty_print(fit_info)))
+        try:
+            for i, result in enumerate(sampler.sample(
+                    initial_positions, iterations=nsteps)):
+                if pool is not None:
+                    # The likelihood was evaluated in the workers, so
+                    # last_params and last_lnprob are not set here
+                    best = np.argmax(result.log_prob)
+                    self.last_params = np.copy(result.coords[best])
+                    self.last_lnprob = result.log_prob[best]
+                if (i + 1) % 10 == 0:
+                    print("Step {}: {}".format(i + 1, self.pretty_print(fit_info)))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
         best_params_arr = sampler.flatchain[np.argmax(
             sampler.flatlnprobability)]
@@ -347,7 +444,8 @@ class CombinedRetriever:
             ret = self._ln_like(
                 params, transit_calc, eclipse_calc, fit_info,
                 transit_depths, transit_errors,
-                eclipse_depths, eclipse_errors, ret_best_fit=True)
+                eclipse_depths, eclipse_errors, zero_opacities=zero_opacities,
+                ret_best_fit=True)
             if ret == -np.inf: continue
             _, transit_info, _, eclipse_info = ret
                 
@@ -391,7 +489,7 @@ class CombinedRetriever:
                       include_condensation=True, rad_method="xsec",
                       maxiter=None, maxcall=None, nlive=250,
                       num_final_samples=100, zero_opacities=[],
-                      **dynesty_kwargs):
+                      num_processes=None, **dynesty_kwargs):
         '''Runs nested sampling to retrieve atmospheric parameters.
 
         Parameters
@@ -425,6 +523,10 @@ class CombinedRetriever:
             Number of live points to use for nested sampling
         zero_opacities : list of strings                                                                                                                                                                   
             List of molecules to zero opacities for
+        num_processes : int, optional
+            If greater than 1, evaluate the likelihood in parallel with a
+            multiprocessing pool of this many processes.  The same caveats as
+            for run_emcee apply.
         **dynesty_kwargs : keyword arguments to pass to dynesty's NestedSampler
 
         Returns
@@ -432,6 +534,7 @@ class CombinedRetriever:
         result : RetrievalResult object
         '''        
         self.params_to_lnlike = {}
+        fit_info._clear_cache()
         transit_calc = None
         eclipse_calc = None
         if transit_bins is not None:
@@ -444,28 +547,29 @@ class CombinedRetriever:
                 include_condensation=include_condensation, method=rad_method)
             eclipse_calc.change_wavelength_bins(eclipse_bins)
 
-        def transform_prior(cube):
-            new_cube = np.zeros(len(cube))
-            for i in range(len(cube)):
-                new_cube[i] = fit_info._from_unit_interval(i, cube[i])
-            return new_cube
-
-        def dynesty_ln_like(cube):
-            lnlike_per_point = self._ln_like(cube, transit_calc, eclipse_calc, fit_info, transit_depths, transit_errors,
-                                    eclipse_depths, eclipse_errors, zero_opacities=zero_opacities, lnlike_per_point=True)
-            if not np.isscalar(lnlike_per_point):
-                ln_like = lnlike_per_point.sum()
-            else:
-                assert(lnlike_per_point == -np.inf)
-                ln_like = -np.inf
-            
-            if np.random.randint(100) == 0:
-                print("\nEvaluated params: {}".format(self.pretty_print(fit_info)))
-            return ln_like
-
+        ln_prob_args = (transit_calc, eclipse_calc, fit_info, transit_depths, transit_errors,
+                        eclipse_depths, eclipse_errors, zero_opacities)
         num_dim = fit_info._get_num_fit_params()
-        sampler = NestedSampler(dynesty_ln_like, transform_prior, num_dim, bound='multi', nlive=nlive, **dynesty_kwargs)
-        sampler.run_nested(maxiter=maxiter, maxcall=maxcall)
+        pool = None
+        if num_processes is not None and num_processes > 1:
+            pool = _make_pool(num_processes, self, ln_prob_args)
+            dynesty_kwargs.setdefault("queue_size", num_processes)
+            sampler = NestedSampler(
+                _dynesty_worker_ln_like, _dynesty_worker_transform_prior,
+                num_dim, bound='multi', nlive=nlive, pool=pool,
+                **dynesty_kwargs)
+        else:
+            sampler = NestedSampler(
+                lambda cube: self._dynesty_ln_like(cube, *ln_prob_args),
+                lambda cube: self._transform_prior(cube, fit_info),
+                num_dim, bound='multi', nlive=nlive, **dynesty_kwargs)
+
+        try:
+            sampler.run_nested(maxiter=maxiter, maxcall=maxcall)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
         result = CustomDynestyResult(sampler.results)
         result.logp = result.logl + np.array([fit_info._ln_prior(params) for params in result.samples])
         best_params_arr = result.samples[np.argmax(result.logp)]
@@ -507,7 +611,8 @@ class CombinedRetriever:
             _, transit_info, _, eclipse_info = self._ln_like(
                 params, transit_calc, eclipse_calc, fit_info,
                 transit_depths, transit_errors,
-                eclipse_depths, eclipse_errors, ret_best_fit=True)
+                eclipse_depths, eclipse_errors, zero_opacities=zero_opacities,
+                ret_best_fit=True)
             if transit_depths is not None:
                 retrieval_result.random_transit_depths.append(transit_info["unbinned_depths"] * transit_info["unbinned_correction_factors"])
             if eclipse_depths is not None:
@@ -531,6 +636,7 @@ class CombinedRetriever:
         import pymultinest
         
         self.params_to_lnlike = {}
+        fit_info._clear_cache()
         transit_calc = None
         eclipse_calc = None
         if transit_bins is not None:
@@ -609,7 +715,8 @@ class CombinedRetriever:
             _, transit_info, _, eclipse_info = self._ln_like(
                 params, transit_calc, eclipse_calc, fit_info,
                 transit_depths, transit_errors,
-                eclipse_depths, eclipse_errors, ret_best_fit=True)
+                eclipse_depths, eclipse_errors, zero_opacities=zero_opacities,
+                ret_best_fit=True)
             if transit_depths is not None:                                                
                 retrieval_result.random_transit_depths.append(transit_info["unbinned_depths"] * transit_info["unbinned_correction_factors"])
             if eclipse_depths is not None:
@@ -1,6 +1,5 @@
 from . import _cupy_numpy as xp
 expn=xp.scipy.special.expn
-import matplotlib.pyplot as plt
 import scipy.special
 from astropy.io import ascii
 import pandas as pd
@@ -10,6 +10,17 @@ class FitInfo:
         for key in guesses_dict:
             self.all_params[key] = _Param(guesses_dict[key])
 
+        self._clear_cache()
+
+    def _clear_cache(self):
+        # Built lazily from all_params on first use, since samplers call
+        # _within_limits and _interpret_param_array millions of times.
+        # Editing all_params directly does not clear them; the retrievers
+        # call this at the start of every run instead.
+        self._low_lims = None
+        self._high_lims = None
+        self._fixed_params = None
+
     def add_uniform_fit_param(self, name, low_lim, high_lim,
                               low_guess=None, high_guess=None):
         '''Fit for the parameter `name` using a uniform prior between `low_lim`
@@ -30,6 +41,7 @@ class FitInfo:
         self.fit_param_names.append(name)
         self.all_params[name] = _UniformParam(best_guess, low_lim, high_lim,
                                               low_guess, high_guess)
+        self._clear_cache()
 
     def add_gaussian_fit_param(self, name, std, low_guess=None, high_guess=None):
         '''Fit for the parameter `name` using a Gaussian prior with standard
@@ -50,6 +62,7 @@ class FitInfo:
         self.fit_param_names.append(name)
         self.all_params[name] = _GaussianParam(
             mean, std, low_guess, high_guess)
+        self._clear_cache()
 
     def add_gases_clr(self, gases, low_lim=1e-12):
         self.gases = gases
@@ -72,40 +85,44 @@ class FitInfo:
         if len(array) != len(self.fit_param_names):
             raise ValueError("Fit array invalid")
 
-        result = dict()
-        for i, key in enumerate(self.fit_param_names):
-            result[key] = array[i]
-
-        for key in self.all_params:
-            if key not in result:
-                result[key] = self.all_params[key].best_guess
+        if self._fixed_params is None:
+            self._fixed_params = {
+                key: param.best_guess for key, param in self.all_params.items()
+                if key not in self.fit_param_names}
 
+        result = dict(self._fixed_params)
+        result.update(zip(self.fit_param_names, array))
         return result
 
     def _within_limits(self, array):
         if len(array) != len(self.fit_param_names):
             raise ValueError("Fit array invalid")
 
-        for i, key in enumerate(self.fit_param_names):
-            if not self.all_params[key].within_limits(array[i]):
-                return False
+        if self._low_lims is None:
+            # Only uniform parameters have hard limits
+            params = [self.all_params[key] for key in self.fit_param_names]
+            self._low_lims = np.array(
+                [p.low_lim if isinstance(p, _UniformParam) else -np.inf
+                 for p in params])
+            self._high_lims = np.array(
+                [p.high_lim if isinstance(p, _UniformParam) else np.inf
+                 for p in params])
 
-        return True
+        array = np.asarray(array)
+        return bool(np.all((array > self._low_lims) & (array < self._high_lims)))
 
     def _generate_rand_param_arrays(self, num_arrays):
-        result = []
-
-        for i in range(num_arrays):
-            row = []
-            for name in self.fit_param_names:
-                if i == 0:
-                    # Have one walker with fiducial value
-                    row.append(self.all_params[name].best_guess)
-                else:
-                    row.append(self.all_params[name].get_random_value())
-            result.append(row)
-
-        return np.array(result)
+        params = [self.all_params[name] for name in self.fit_param_names]
+        low_guesses = np.array([p.low_guess for p in params])
+        high_guesses = np.array([p.high_guess for p in params])
+        result = np.random.uniform(low_guesses, high_guesses,
+                                   size=(num_arrays, len(params)))
+
+        if num_arrays > 0:
+            # Have one walker with fiducial value
+            result[0] = [p.best_guess for p in params]
+
+        return result
 
     def _get(self, name):
         return self.all_params[name].best_guess
@@ -1,6 +1,5 @@
 from unittest import skip
 import numpy as np
-import matplotlib.pyplot as plt
 import scipy.special
 import time
 
@@ -201,6 +200,7 @@ class SurfaceCalculator:
             self.hemispherical_emissivity = np.interp(self.wavelengths, self.rh_wavelengths, self.hemispherical_emissivity_og)
 
             if plot:
+                import matplotlib.pyplot as plt
                 plt.plot(self.geoa['Wavelength'] * 1e6, self.surface_geoa_old, color = 'red', label = 'old')
                 plt.plot(self.wavelengths * 1e6, self.surface_geoa, 'k--', label = 'new')
                 plt.title(f'{self.surface_type} - changed')
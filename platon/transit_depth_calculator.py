@@ -1,5 +1,4 @@
 from pkg_resources import resource_filename
-import matplotlib.pyplot as plt
 import scipy
 import numpy as np
 
@@ -49,9 +48,9 @@ class TransitDepthCalculator:
 
         Raises
         ------
-        NotImplementedError
-            Raised when `change_wavelength_bins` is called more than once,
-            which is not supported.
+        ValueError
+            Raised when a bin is outside the wavelength grid, or contains no
+            wavelengths.
         """
         self.atm.change_wavelength_bins(bins)
         
@@ -103,19 +102,23 @@ class TransitDepthCalculator:
                 xp.array(intermediate_stellar_spectrum),\
                 xp.array(intermediate_correction_factors)
                         
-        binned_wavelengths = []
-        binned_depths = []
-        binned_stellar_spectrum = []
-        
-        for (start, end) in xp.cpu(self.atm.wavelength_bins):
-            cond = np.logical_and(
-                intermediate_lambdas >= start,
-                intermediate_lambdas < end)
-            binned_wavelengths.append(np.mean(intermediate_lambdas[cond]))
-            binned_depth = np.average(intermediate_depths[cond] * intermediate_correction_factors[cond],
-                                      weights=intermediate_stellar_spectrum[cond])
-            binned_depths.append(binned_depth)
-            binned_stellar_spectrum.append(np.median(intermediate_stellar_spectrum[cond]))
+        # intermediate_lambdas is sorted, so bin i covers the index range
+        # [starts[i], ends[i]).  Bins may overlap, so sum each range
+        # separately with reduceat on interleaved (start, end) indices; the
+        # appended zero keeps an end index at the last point in bounds.
+        bins = xp.cpu(self.atm.wavelength_bins)
+        starts = np.searchsorted(intermediate_lambdas, bins[:, 0])
+        ends = np.searchsorted(intermediate_lambdas, bins[:, 1])
+        indices = np.column_stack([starts, ends]).ravel()
+
+        def bin_sums(values):
+            return np.add.reduceat(np.append(values, 0), indices)[::2]
+
+        binned_wavelengths = bin_sums(intermediate_lambdas) / (ends - starts)
+        binned_depths = bin_sums(intermediate_depths * intermediate_correction_factors * intermediate_stellar_spectrum) / \
+            bin_sums(intermediate_stellar_spectrum)
+        binned_stellar_spectrum = [np.median(intermediate_stellar_spectrum[start:end])
+                                   for start, end in zip(starts, ends)]
 
         return xp.array(binned_wavelengths), xp.array(binned_depths), xp.array(binned_stellar_spectrum), xp.array(intermediate_lambdas), xp.array(intermediate_depths), xp.array(intermediate_stellar_spectrum), xp.array(intermediate_correction_factors)
 
@@ -284,10 +287,12 @@ class TransitDepthCalculator:
         dr = atm_info["dr"]
         tau_los = get_line_of_sight_tau(atm_info["absorption_coeff_atm"],
                                         radii)
-        absorption_fraction = 1 - xp.exp(-tau_los)
+        # 1 - exp(-tau) in one pass, and accurate for optically thin layers
+        absorption_fraction = -xp.expm1(-tau_los)
+        radii_dr = radii[1:] * dr
 
         transit_depths = (radii.min() / star_radius)**2 \
-            + 2 / star_radius**2 * absorption_fraction.dot(radii[1:] * dr)
+            + 2 / star_radius**2 * absorption_fraction.dot(radii_dr)
         
         #For correlated-k: transit_depths has n_gauss points for every wavelength; unbinned_depths
         #has 1 point for every wavelength
@@ -0,0 +1,64 @@
+import unittest
+import numpy as np
+
+from platon.fit_info import FitInfo
+
+class TestFitInfo(unittest.TestCase):
+    def get_fit_info(self):
+        fit_info = FitInfo({"Rs": 7e8, "T": 1200, "logZ": 0, "CO_ratio": 0.53})
+        fit_info.add_gaussian_fit_param("Rs", 1e7)
+        fit_info.add_uniform_fit_param("T", 800, 1800)
+        return fit_info
+
+    def test_within_limits(self):
+        fit_info = self.get_fit_info()
+        self.assertTrue(fit_info._within_limits([6e8, 1000]))
+        self.assertFalse(fit_info._within_limits([6e8, 800]))
+        self.assertFalse(fit_info._within_limits([6e8, 2000]))
+
+        # Adding a parameter must update the limits
+        fit_info.add_uniform_fit_param("logZ", -1, 3)
+        self.assertTrue(fit_info._within_limits([6e8, 1000, 0]))
+        self.assertFalse(fit_info._within_limits([6e8, 1000, 3.5]))
+
+        with self.assertRaises(ValueError):
+            fit_info._within_limits([6e8, 1000])
+
+    def test_interpret_param_array(self):
+        fit_info = self.get_fit_info()
+        params = fit_info._interpret_param_array([6e8, 1000])
+        self.assertEqual(params, {"Rs": 6e8, "T": 1000, "logZ": 0, "CO_ratio": 0.53})
+
+        fit_info.add_uniform_fit_param("logZ", -1, 3)
+        params = fit_info._interpret_param_array([6e8, 1000, 2])
+        self.assertEqual(params, {"Rs": 6e8, "T": 1000, "logZ": 2, "CO_ratio": 0.53})
+
+    def test_edit_all_params(self):
+        fit_info = self.get_fit_info()
+        self.assertTrue(fit_info._within_limits([6e8, 1000]))
+        self.assertEqual(fit_info._interpret_param_array([6e8, 1000])["logZ"], 0)
+
+        # In-place edits take effect once the retriever clears the cache
+        fit_info.all_params["T"].low_lim = 1100
+        fit_info.all_params["logZ"].best_guess = 1
+        fit_info._clear_cache()
+        self.assertFalse(fit_info._within_limits([6e8, 1000]))
+        self.assertEqual(fit_info._interpret_param_array([6e8, 1000])["logZ"], 1)
+
+    def test_generate_rand_param_arrays(self):
+        fit_info = self.get_fit_info()
+        arrays = fit_info._generate_rand_param_arrays(100)
+        self.assertEqual(arrays.shape, (100, 2))
+
+        # First row holds the best guesses
+        self.assertEqual(arrays[0, 0], 7e8)
+        self.assertEqual(arrays[0, 1], 1200)
+
+        # The rest are drawn from [low_guess, high_guess]
+        self.assertTrue(np.all(arrays[1:, 0] >= 7e8 - 2e7))
+        self.assertTrue(np.all(arrays[1:, 0] <= 7e8 + 2e7))
+        self.assertTrue(np.all(arrays[1:, 1] >= 800))
+        self.assertTrue(np.all(arrays[1:, 1] <= 1800))
+
+if __name__ == '__main__':
+    unittest.main()
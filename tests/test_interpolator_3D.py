@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+
+from platon import _interpolator_3D
+from platon import _numba_kernels
+
+class TestInterpolator3D(unittest.TestCase):
+    def check_condition_array(self, target_data, expected_indices, max_cutoff=np.inf):
+        grid = np.linspace(100, 3000, 30)
+        cond = _interpolator_3D.get_condition_array(
+            np.array(target_data), grid, max_cutoff)
+        self.assertEqual(list(np.nonzero(cond)[0]), list(expected_indices))
+
+    def test_get_condition_array(self):
+        # Grid points are 100, 200, ..., 3000
+        self.check_condition_array([1000], [9])
+        self.check_condition_array([1050, 1520], range(9, 16))
+        self.check_condition_array([1000, 1500], range(9, 15))
+        self.check_condition_array([50, 3500], range(30))
+        self.check_condition_array([2950], [28, 29])
+        self.check_condition_array([1050, 2500], range(9, 12), max_cutoff=1200)
+        self.check_condition_array([1050, 2500], range(9, 12), max_cutoff=1150)
+
+    @unittest.skipIf(_numba_kernels.numba is None, "numba is not installed")
+    def test_regular_grid_interp_numba(self):
+        ys = np.linspace(300, 3000, 10)
+        xs = np.linspace(-4, 8, 13)
+        data = np.random.rand(len(ys), len(xs), 50)
+        target_ys = np.random.uniform(300, 3000, 20)
+        target_xs = np.random.uniform(-4, 8, 20)
+
+        enabled = _numba_kernels.enabled
+        results = []
+        try:
+            for use_numba in [True, False]:
+                _numba_kernels.enabled = use_numba
+                results.append(_interpolator_3D.regular_grid_interp(
+                    ys, xs, data, target_ys, target_xs))
+        finally:
+            _numba_kernels.enabled = enabled
+
+        self.assertTrue(np.allclose(results[0], results[1]))
+
+if __name__ == '__main__':
+    unittest.main()
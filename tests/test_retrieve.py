@@ -1,12 +1,19 @@
 import unittest
+import os
+import tempfile
 import numpy as np
 import copy
 import emcee
 import matplotlib
 matplotlib.use("Agg")
 import dynesty
+try:
+    import h5py
+except ImportError:
+    h5py = None
 
 from platon.combined_retriever import CombinedRetriever
+from platon.transit_depth_calculator import TransitDepthCalculator
 from platon.fit_info import FitInfo
 from platon.constants import R_sun, R_jup, M_jup
 from platon.errors import AtmosphereError
@@ -72,6 +79,45 @@ class TestRetriever(unittest.TestCase):
         self.assertEqual(result.lnprobability.shape, (nwalkers, nsteps))
                 
 
+    def test_emcee_processes(self):
+        self.initialize(True)
+        nwalkers = 20
+        nsteps = 3
+
+        # Run the numba kernels in this process first, so that the pool is
+        # created after their thread pool has started
+        TransitDepthCalculator().compute_depths(R_sun, M_jup, R_jup, 1200)
+
+        retriever = CombinedRetriever()
+        result = retriever.run_emcee(self.wavelength_bins, self.depths, self.errors, None, None, None, self.fit_info, nsteps=nsteps, nwalkers=nwalkers, num_final_samples=5, num_processes=2)
+        self.assertEqual(result.chain.shape, (nwalkers, nsteps, len(self.fit_info.fit_param_names)))
+        self.assertEqual(len(result.pointwise_lnlikes), 5)
+
+    @unittest.skipIf(h5py is None, "h5py is not installed")
+    def test_emcee_backend(self):
+        self.initialize(True)
+        nwalkers = 20
+        nsteps = 3
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "chain.h5")
+            retriever = CombinedRetriever()
+            result = retriever.run_emcee(self.wavelength_bins, self.depths, self.errors, None, None, None, self.fit_info, nsteps=nsteps, nwalkers=nwalkers, num_final_samples=5, backend_filename=filename)
+            chain = emcee.backends.HDFBackend(filename, read_only=True).get_chain()
+
+        self.assertEqual(chain.shape, (nsteps, nwalkers, len(self.fit_info.fit_param_names)))
+        self.assertTrue(np.array_equal(chain.reshape((-1, chain.shape[2])), result.flatchain))
+
+    def test_dynesty_processes(self):
+        self.initialize(False)
+        TransitDepthCalculator().compute_depths(R_sun, M_jup, R_jup, 1200)
+
+        retriever = CombinedRetriever()
+        result = retriever.run_dynesty(self.wavelength_bins, self.depths, self.errors, None, None, None, self.fit_info, maxcall=200, num_final_samples=5, num_processes=2, queue_size=1)
+        self.assertTrue(isinstance(result, RetrievalResult))
+        self.assertEqual(result.samples.shape[1], len(self.fit_info.fit_param_names))
+        self.assertEqual(len(result.pointwise_lnlikes), 5)
+
     def test_dynesty(self):
         self.initialize(False)
         retriever = CombinedRetriever()
@@ -11,6 +11,7 @@ import platon
 from platon.abundance_getter import AbundanceGetter
 from platon.transit_depth_calculator import TransitDepthCalculator
 from platon import  __path__
+from platon import _numba_kernels
 from platon.errors import AtmosphereError
 from platon.constants import M_jup, R_sun, R_jup, G, AMU, k_B
 
@@ -90,6 +91,90 @@ class TestTransitDepthCalculator(unittest.TestCase):
         self.assertEqual(len(wavelengths), len(bins))
         self.assertEqual(len(transit_depths), len(bins))
 
+    def test_change_wavelength_bins_again(self):
+        first_bins = 1e-6 * np.array([[0.4, 0.6], [1, 1.1], [3.2, 4]])
+        second_bins = 1e-6 * np.array([[0.5, 0.7], [1.2, 1.4], [5, 6]])
+        depth_calculator = TransitDepthCalculator()
+        depth_calculator.change_wavelength_bins(first_bins)
+        depth_calculator.compute_depths(R_sun, M_jup, R_jup, 1200)
+
+        # Re-binning must start from the full grid, not the first binning
+        depth_calculator.change_wavelength_bins(second_bins)
+        wavelengths, depths, _ = depth_calculator.compute_depths(
+            R_sun, M_jup, R_jup, 1200)
+        fresh_calculator = TransitDepthCalculator()
+        fresh_calculator.change_wavelength_bins(second_bins)
+        expected_wavelengths, expected_depths, _ = fresh_calculator.compute_depths(
+            R_sun, M_jup, R_jup, 1200)
+        self.assertTrue(np.allclose(wavelengths, expected_wavelengths))
+        self.assertTrue(np.allclose(depths, expected_depths))
+
+        # None restores the full grid
+        depth_calculator.change_wavelength_bins(None)
+        wavelengths, depths, _ = depth_calculator.compute_depths(
+            R_sun, M_jup, R_jup, 1200)
+        expected_wavelengths, expected_depths, _ = TransitDepthCalculator().compute_depths(
+            R_sun, M_jup, R_jup, 1200)
+        self.assertTrue(np.array_equal(wavelengths, expected_wavelengths))
+        self.assertTrue(np.allclose(depths, expected_depths))
+
+    def test_overlapping_bins(self):
+        bins = 1e-6 * np.array([[1.1, 1.3], [1.2, 1.4], [1.4, 1.5], [3, 4]])
+        depth_calculator = TransitDepthCalculator()
+        depth_calculator.change_wavelength_bins(bins)
+        wavelengths, depths, info_dict = depth_calculator.compute_depths(
+            R_sun, M_jup, R_jup, 1200, T_star=5500, full_output=True)
+
+        lambdas = info_dict["unbinned_wavelengths"]
+        unbinned_depths = info_dict["unbinned_depths"] * \
+            info_dict["unbinned_correction_factors"]
+        stellar_spectrum = info_dict["unbinned_stellar_spectrum"]
+        for i, (start, end) in enumerate(bins):
+            cond = np.logical_and(lambdas >= start, lambdas < end)
+            self.assertAlmostEqual(wavelengths[i] / np.mean(lambdas[cond]), 1)
+            expected_depth = np.average(unbinned_depths[cond],
+                                        weights=stellar_spectrum[cond])
+            self.assertAlmostEqual(depths[i] / expected_depth, 1)
+            self.assertEqual(info_dict["binned_stellar_spectrum"][i],
+                             np.median(stellar_spectrum[cond]))
+
+    @unittest.skipIf(_numba_kernels.numba is None, "numba is not installed")
+    def test_numba_kernels(self):
+        # The numba kernels must give the same depths as the numpy code
+        enabled = _numba_kernels.enabled
+        all_depths = []
+        try:
+            for use_numba in [True, False]:
+                _numba_kernels.enabled = use_numba
+                depth_calculator = TransitDepthCalculator()
+                _, depths, _ = depth_calculator.compute_depths(
+                    R_sun, M_jup, R_jup, 1200, logZ=0.5, CO_ratio=0.7)
+                all_depths.append(depths)
+        finally:
+            _numba_kernels.enabled = enabled
+
+        self.assertTrue(np.allclose(all_depths[0], all_depths[1]))
+
+    def test_repeated_vmrs(self):
+        # Absorption cached for one set of VMRs must not be reused for another
+        gases = ["H2O", "CO", "H2", "He"]
+        depth_calculator = TransitDepthCalculator()
+        _, _, first = depth_calculator.compute_depths(
+            R_sun, M_jup, R_jup, 1000, logZ=None, CO_ratio=None,
+            gases=gases, vmrs=[1e-3, 1e-4, 0.85, 0.1489], full_output=True)
+        _, second_depths, second = depth_calculator.compute_depths(
+            R_sun, M_jup, R_jup, 1000, logZ=None, CO_ratio=None,
+            gases=gases, vmrs=[1e-5, 1e-2, 0.85, 0.13999], full_output=True)
+        _, expected_depths, expected = TransitDepthCalculator().compute_depths(
+            R_sun, M_jup, R_jup, 1000, logZ=None, CO_ratio=None,
+            gases=gases, vmrs=[1e-5, 1e-2, 0.85, 0.13999], full_output=True)
+
+        self.assertFalse(np.allclose(first["absorption_coeff_atm"],
+                                     second["absorption_coeff_atm"]))
+        self.assertTrue(np.allclose(second["absorption_coeff_atm"],
+                                    expected["absorption_coeff_atm"]))
+        self.assertTrue(np.allclose(second_depths, expected_depths))
+
     def test_power_law_haze(self):
         Rs = R_sun     
         Mp = M_jup     